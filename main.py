@@ -1,9 +1,15 @@
+import io
+import logging
+import re
+import sys
 import openpyxl
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional, Dict, List
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
 class IPConfig:
     original_name: str
     role: str  # 'master' or 'slave'
@@ -16,8 +22,12 @@ class IPConfig:
     final_protocol: str = "-"
     final_clk_domain: str = "-"
     connected_interconnect: str = "-"
+    role_label: str = field(init=False, repr=False)  # 'MASTER' or 'SLAVE', as written to config.txt
+    
+    def __post_init__(self):
+        self.role_label = "MASTER" if self.role == 'master' else "SLAVE"
 
-@dataclass
+@dataclass(slots=True)
 class InterconnectConfig:
     name: str
     bit_width: int
@@ -27,7 +37,12 @@ class InterconnectConfig:
     master_ips: List[str]  # Original IP names (ip1, ip2, etc.)
     slave_ips: List[str]   # Original IP names (ip3, ip4, etc.)
 
+_SPLIT_IPS = re.compile(r"\s*,\s*").split  # Comma-separated IP lists in Sheet2
+
 class ConfigGenerator:
+    PREVIEW_ROWS = 50  # Max IP rows echoed to the console after writing config.txt
+    COLUMN_WIDTHS = (15, 10, 15, 15, 15, 15, 15, 15, 15)  # config.txt column widths
+    
     def __init__(self):
         self.ip_configs: Dict[str, IPConfig] = {}  # Key: M1/S1 format
         self.original_ip_map: Dict[str, str] = {}  # Original name to M1/S1 mapping
@@ -35,284 +50,304 @@ class ConfigGenerator:
         self.script_dir = Path(__file__).parent
         self.master_count = 0
         self.slave_count = 0
+        self._excel_file: Optional[Path] = None
+        
+        # Fixed-width template for config.txt rows, built once from the column widths
+        self._row_fmt = "".join(f"{{:<{width}}}" for width in self.COLUMN_WIDTHS) + "\n"
     
     def find_excel_file(self) -> Path:
-        """Finds the first .xls or .xlsx file in script directory"""
+        """Finds the first .xls or .xlsx file in script directory (cached after first lookup)"""
+        if self._excel_file is not None:
+            return self._excel_file
+        
         for file in self.script_dir.glob("*.*"):
             if file.suffix.lower() in ('.xls', '.xlsx'):
+                self._excel_file = file
                 return file
         raise FileNotFoundError("No Excel file found in script directory")
     
     def read_excel(self) -> None:
         """Reads the Excel file with two sheets (IPs and Interconnects)"""
         excel_file = self.find_excel_file()
-        print(f"\n[DEBUG] Found Excel file: {excel_file.name}")
+        logger.debug("Found Excel file: %s", excel_file.name)
+        
+        original_ip_map = self.original_ip_map
+        interconnect_configs = self.interconnect_configs
+        intern = sys.intern
         
         try:
-            workbook = openpyxl.load_workbook(excel_file)
-            
-            # =============================================
-            # Process IP sheet (first sheet) - just store basic info
-            # =============================================
-            print("\n[DEBUG] Processing IP Sheet:")
-            ip_sheet = workbook.worksheets[0]
-            for row_idx, row in enumerate(ip_sheet.iter_rows(min_row=2, values_only=True), start=2):
-                if not row[0]:  # Skip if IP name is empty
-                    continue
-                
-                original_name = str(row[0]).strip()
-                
-                # Store original IP info (role will be determined from Sheet2)
-                self.original_ip_map[original_name] = original_name  # Temporary mapping
-                print(f"[DEBUG] Found IP: {original_name}")
+            # read_only streams rows instead of building the full DOM;
+            # data_only gives cached values rather than formulas.
+            # Opened exactly once per read and closed after both sheets are read,
+            # so the workbook is deliberately not memoized (a cached one would be closed).
+            workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
             
-            # =============================================
-            # Process Interconnect sheet (second sheet)
-            # =============================================
-            if len(workbook.worksheets) > 1:
-                print("\n[DEBUG] Processing Interconnect Sheet:")
-                interconnect_sheet = workbook.worksheets[1]
-                
-                # Find column indices for key columns
-                header_row = next(interconnect_sheet.iter_rows(min_row=1, max_row=1, values_only=True))
-                try:
-                    ic_name_col = header_row.index("interconnect name")
-                    masters_col = header_row.index("set of masters")
-                    slaves_col = header_row.index("set of slaves")
-                except ValueError as e:
-                    raise ValueError("Could not find required columns in Sheet2") from e
-                
-                for row_idx, row in enumerate(interconnect_sheet.iter_rows(min_row=2, values_only=True), start=2):
-                    if not row[ic_name_col]:  # Skip if interconnect name is empty
+            try:
+                # =============================================
+                # Process IP sheet (first sheet) - just store basic info
+                # =============================================
+                logger.debug("Processing IP Sheet:")
+                ip_sheet = workbook.worksheets[0]
+                ip_rows = []  # (original_name, read_write, bit_width, frequency, clk_domain)
+                rows = ip_sheet.values
+                next(rows, None)  # Skip header row
+                for row in rows:
+                    if not row[0]:  # Skip if IP name is empty
                         continue
                     
-                    ic_name = str(row[ic_name_col]).strip()
+                    # Interned so the Sheet2 names share one hashed object with Sheet1
+                    original_name = intern(str(row[0]).strip())
+                    ip_rows.append((original_name, row[1], row[2], row[3], row[4]))
                     
-                    # Get masters and slaves for this interconnect
-                    master_ips = []
-                    if row[masters_col]:
-                        master_ips = [ip.strip() for ip in str(row[masters_col]).split(',')]
+                    # Store original IP info (role will be determined from Sheet2)
+                    original_ip_map[original_name] = original_name  # Temporary mapping
+                    logger.debug("Found IP: %s", original_name)
+                
+                # =============================================
+                # Process Interconnect sheet (second sheet)
+                # =============================================
+                if len(workbook.worksheets) > 1:
+                    logger.debug("Processing Interconnect Sheet:")
+                    interconnect_sheet = workbook.worksheets[1]
                     
-                    slave_ips = []
-                    if row[slaves_col]:
-                        slave_ips = [ip.strip() for ip in str(row[slaves_col]).split(',')]
+                    # Find column indices for key columns. Row 1 holds the main headers and
+                    # row 2 the sub-headers under "properties" (bit width, freq, ...).
+                    col_idx = {}
+                    for header_row in interconnect_sheet.iter_rows(min_row=1, max_row=2, values_only=True):
+                        for i, name in enumerate(header_row):
+                            if isinstance(name, str):
+                                col_idx.setdefault(name.strip().lower(), i)
+                    try:
+                        ic_name_col = col_idx["interconnect name"]
+                        masters_col = col_idx["set of masters"]
+                        slaves_col = col_idx["set of slaves"]
+                    except KeyError as e:
+                        raise ValueError("Could not find required columns in Sheet2") from e
                     
-                    print(f"[DEBUG] Interconnect {ic_name} has masters: {master_ips} and slaves: {slave_ips}")
+                    # Property columns fall back to their historical positions if no sub-header is present
+                    bit_width_col = col_idx.get("bit width", 1)
+                    frequency_col = col_idx.get("freq", 2)
+                    protocol_col = col_idx.get("protocol", 3)
+                    clk_domain_col = col_idx.get("clk domain", 4)
                     
-                    interconnect = InterconnectConfig(
-                        name=ic_name,
-                        bit_width=int(row[1]),
-                        frequency=int(row[2]),
-                        protocol=str(row[3]),
-                        clk_domain=str(row[4]),
-                        master_ips=master_ips,
-                        slave_ips=slave_ips
-                    )
-                    self.interconnect_configs[interconnect.name] = interconnect
+                    interconnect_config_cls = InterconnectConfig
+                    for row in interconnect_sheet.iter_rows(min_row=2, values_only=True):
+                        if not row[ic_name_col]:  # Skip if interconnect name is empty
+                            continue
+                        
+                        ic_name = str(row[ic_name_col]).strip()
+                        
+                        # Get masters and slaves for this interconnect
+                        master_ips = []
+                        if row[masters_col]:
+                            master_ips = [intern(ip) for ip in _SPLIT_IPS(str(row[masters_col]).strip()) if ip]
+                        
+                        slave_ips = []
+                        if row[slaves_col]:
+                            slave_ips = [intern(ip) for ip in _SPLIT_IPS(str(row[slaves_col]).strip()) if ip]
+                        
+                        logger.debug("Interconnect %s has masters: %s and slaves: %s", ic_name, master_ips, slave_ips)
+                        
+                        interconnect = interconnect_config_cls(
+                            name=ic_name,
+                            bit_width=int(row[bit_width_col]),
+                            frequency=int(row[frequency_col]),
+                            protocol=str(row[protocol_col]),
+                            clk_domain=str(row[clk_domain_col]),
+                            master_ips=master_ips,
+                            slave_ips=slave_ips
+                        )
+                        interconnect_configs[interconnect.name] = interconnect
+            finally:
+                # Read-only workbooks keep the file handle open until closed
+                workbook.close()
             
             # =============================================
             # Now properly identify masters and slaves
             # =============================================
-            self._identify_masters_slaves()
+            connections = self._identify_masters_slaves(ip_rows)
             
             # =============================================
             # Apply interconnect properties to IPs
             # =============================================
-            self._apply_interconnect_properties()
+            self._apply_interconnect_properties(connections)
             
             # Debug print final IP configurations
-            print("\n[DEBUG] Final IP Configurations:")
-            for ip_name, config in sorted(self.ip_configs.items()):
-                print(f"{ip_name} ({config.role.upper()}): Connected to {config.connected_interconnect}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Final IP Configurations:")
+                for ip_name, config in self._sorted_ip_configs():
+                    logger.debug("%s (%s): Connected to %s", ip_name, config.role.upper(), config.connected_interconnect)
             
             print(f"\nProcessed {len(self.ip_configs)} IPs and {len(self.interconnect_configs)} interconnects")
             
         except Exception as e:
-            print(f"\n[ERROR] Reading Excel file: {str(e)}")
+            logger.error("Reading Excel file: %s", e)
             raise
     
-    def _identify_masters_slaves(self):
-        """Identifies masters and slaves based on Sheet2 data"""
-        print("\n[DEBUG] Identifying masters and slaves:")
+    def _identify_masters_slaves(self, ip_rows: List[tuple]) -> List[Tuple[str, str, str]]:
+        """Identifies masters and slaves based on Sheet2 data, filling details from buffered Sheet1 rows.
         
-        # First pass: Identify all masters from "Set of Masters" columns
-        all_masters = set()
-        for ic_config in self.interconnect_configs.values():
-            all_masters.update(ic_config.master_ips)
+        Returns the (original_ip, role, interconnect name) connections collected on the way,
+        in Sheet2 order, so properties can be applied without walking the interconnects again."""
+        logger.debug("Identifying masters and slaves:")
         
-        # Second pass: Identify all slaves from "Set of Slaves" columns
-        all_slaves = set()
-        for ic_config in self.interconnect_configs.values():
-            all_slaves.update(ic_config.slave_ips)
+        # Single pass over the interconnects: record every connection and the role(s) of each IP
+        connections = []
+        add_connection = connections.append
+        role_of: Dict[str, str] = {}  # 'master', 'slave' or 'both'
+        for ic_name, ic_config in self.interconnect_configs.items():
+            for role, ips in (('master', ic_config.master_ips), ('slave', ic_config.slave_ips)):
+                for original_ip in ips:
+                    add_connection((original_ip, role, ic_name))
+                    current = role_of.get(original_ip)
+                    if current is None:
+                        role_of[original_ip] = role
+                    elif current != role:
+                        role_of[original_ip] = 'both'
         
         # Check for IPs listed as both master and slave
-        conflict_ips = all_masters.intersection(all_slaves)
+        conflict_ips = {ip for ip, role in role_of.items() if role == 'both'}
         if conflict_ips:
-            print(f"[WARNING] IPs listed as both master and slave: {conflict_ips}")
+            logger.warning("IPs listed as both master and slave: %s", conflict_ips)
         
         # Create M1/S1 names and IP configurations
-        self.master_count = 0
-        self.slave_count = 0
-        self.original_ip_map = {}
+        master_count = 0
+        slave_count = 0
+        self.original_ip_map = original_ip_map = {}
+        ip_configs = self.ip_configs
+        ip_config_cls = IPConfig
         
-        # Process masters first
-        for master_ip in sorted(all_masters):
-            self.master_count += 1
-            ip_name = f"M{self.master_count}"
-            self.original_ip_map[master_ip] = ip_name
-            
-            # Create IP config (basic info will be updated when we process Sheet1 again)
-            self.ip_configs[ip_name] = IPConfig(
-                original_name=master_ip,
-                role='master',
-                read_write='-',
-                original_bit_width=0,
-                original_frequency=0,
-                original_clk_domain='-'
-            )
-            print(f"[DEBUG] Identified master: {master_ip} -> {ip_name}")
+        # One sorted list of (ip, role) pairs; an IP listed on both sides gets an M# and an S# entry
+        items = [(ip, r) for ip, role in role_of.items() for r in ('master', 'slave') if role in (r, 'both')]
+        items.sort()
         
-        # Process slaves
-        for slave_ip in sorted(all_slaves):
-            self.slave_count += 1
-            ip_name = f"S{self.slave_count}"
-            self.original_ip_map[slave_ip] = ip_name
+        for original_ip, role in items:
+            if role == 'master':
+                master_count += 1
+                ip_name = f"M{master_count}"
+            else:
+                slave_count += 1
+                ip_name = f"S{slave_count}"
+            original_ip_map[original_ip] = ip_name
             
-            # Create IP config (basic info will be updated when we process Sheet1 again)
-            self.ip_configs[ip_name] = IPConfig(
-                original_name=slave_ip,
-                role='slave',
+            # Create IP config (basic info is filled in from Sheet1 below)
+            ip_configs[ip_name] = ip_config_cls(
+                original_name=original_ip,
+                role=role,
                 read_write='-',
                 original_bit_width=0,
                 original_frequency=0,
                 original_clk_domain='-'
             )
-            print(f"[DEBUG] Identified slave: {slave_ip} -> {ip_name}")
+            logger.debug("Identified %s: %s -> %s", role, original_ip, ip_name)
         
-        # Now process Sheet1 again to fill in the IP details
-        workbook = openpyxl.load_workbook(self.find_excel_file())
-        ip_sheet = workbook.worksheets[0]
+        self.master_count = master_count
+        self.slave_count = slave_count
         
-        for row in ip_sheet.iter_rows(min_row=2, values_only=True):
-            if not row[0]:
+        # Now use the buffered Sheet1 rows to fill in the IP details
+        for original_name, read_write, bit_width, frequency, clk_domain in ip_rows:
+            ip_name = original_ip_map.get(original_name)
+            if ip_name is None:
                 continue
             
-            original_name = str(row[0]).strip()
-            if original_name in self.original_ip_map:
-                ip_name = self.original_ip_map[original_name]
-                ip_config = self.ip_configs[ip_name]
-                
-                # Update IP details from Sheet1
-                ip_config.read_write = str(row[1])
-                ip_config.original_bit_width = int(row[2])
-                ip_config.original_frequency = int(row[3])
-                ip_config.original_clk_domain = str(row[4])
-                
-                # Initialize final values with original values
-                ip_config.final_bit_width = ip_config.original_bit_width
-                ip_config.final_frequency = ip_config.original_frequency
-                ip_config.final_clk_domain = ip_config.original_clk_domain
+            ip_config = ip_configs[ip_name]
+            
+            # Update IP details from Sheet1
+            ip_config.read_write = str(read_write)
+            ip_config.original_bit_width = int(bit_width)
+            ip_config.original_frequency = int(frequency)
+            ip_config.original_clk_domain = str(clk_domain)
+            
+            # Initialize final values with original values
+            ip_config.final_bit_width = ip_config.original_bit_width
+            ip_config.final_frequency = ip_config.original_frequency
+            ip_config.final_clk_domain = ip_config.original_clk_domain
+        
+        return connections
     
-    def _apply_interconnect_properties(self):
+    def _apply_interconnect_properties(self, connections: List[Tuple[str, str, str]]):
         """Updates IP properties based on connected interconnects"""
-        print("\n[DEBUG] Applying interconnect properties:")
+        logger.debug("Applying interconnect properties:")
         
-        for ic_name, ic_config in self.interconnect_configs.items():
-            # Process masters for this interconnect
-            for original_ip in ic_config.master_ips:
-                if original_ip in self.original_ip_map:
-                    ip_name = self.original_ip_map[original_ip]
-                    ip_config = self.ip_configs[ip_name]
-                    ip_config.connected_interconnect = ic_name
-                    
-                    # Update properties from interconnect
-                    ip_config.final_bit_width = ic_config.bit_width
-                    ip_config.final_frequency = ic_config.frequency
-                    ip_config.final_protocol = ic_config.protocol
-                    ip_config.final_clk_domain = ic_config.clk_domain
-                    
-                    print(f"[DEBUG] Updated master {ip_name} with {ic_name} properties")
-                else:
-                    print(f"[WARNING] Master IP {original_ip} not found in original IP list")
+        original_ip_map = self.original_ip_map
+        ip_configs = self.ip_configs
+        interconnect_configs = self.interconnect_configs
+        
+        for original_ip, role, ic_name in connections:
+            ip_name = original_ip_map.get(original_ip)
+            if ip_name is None:
+                logger.warning("%s IP %s not found in original IP list", role.capitalize(), original_ip)
+                continue
             
-            # Process slaves for this interconnect
-            for original_ip in ic_config.slave_ips:
-                if original_ip in self.original_ip_map:
-                    ip_name = self.original_ip_map[original_ip]
-                    ip_config = self.ip_configs[ip_name]
-                    ip_config.connected_interconnect = ic_name
-                    
-                    # Update properties from interconnect
-                    ip_config.final_bit_width = ic_config.bit_width
-                    ip_config.final_frequency = ic_config.frequency
-                    ip_config.final_protocol = ic_config.protocol
-                    ip_config.final_clk_domain = ic_config.clk_domain
-                    
-                    print(f"[DEBUG] Updated slave {ip_name} with {ic_name} properties")
-                else:
-                    print(f"[WARNING] Slave IP {original_ip} not found in original IP list")
+            ic_config = interconnect_configs[ic_name]
+            ip_config = ip_configs[ip_name]
+            ip_config.connected_interconnect = ic_name
+            
+            # Update properties from interconnect
+            ip_config.final_bit_width = ic_config.bit_width
+            ip_config.final_frequency = ic_config.frequency
+            ip_config.final_protocol = ic_config.protocol
+            ip_config.final_clk_domain = ic_config.clk_domain
+            
+            logger.debug("Updated %s %s with %s properties", role, ip_name, ic_name)
+    
+    def _sorted_ip_configs(self) -> List[Tuple[str, IPConfig]]:
+        """Returns (ip name, config) pairs with masters first, in numeric order (M2 before M10)"""
+        return sorted(self.ip_configs.items(), key=lambda kv: (kv[0][0], int(kv[0][1:])))
     
     def generate_config_file(self) -> None:
         """Generates config.txt in the same directory"""
         output_file = self.script_dir / "config.txt"
+        row_fmt = self._row_fmt
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # Write header
-                header = [
-                    "IP NAME".ljust(15),
-                    "TYPE".ljust(10),
-                    "READ/WRITE".ljust(15),
-                    "BIT WIDTH".ljust(15),
-                    "FREQUENCY".ljust(15),
-                    "PROTOCOL".ljust(15),
-                    "CLK DOMAIN".ljust(15),
-                    "INTERCONNECT".ljust(15),
-                    "ORIGINAL IP".ljust(15)
-                ]
-                f.write("".join(header) + "\n")
+            header = row_fmt.format(
+                "IP NAME", "TYPE", "READ/WRITE", "BIT WIDTH", "FREQUENCY",
+                "PROTOCOL", "CLK DOMAIN", "INTERCONNECT", "ORIGINAL IP"
+            )
+            
+            # Stream the IP configurations to the file in one pass, keeping only
+            # the first PREVIEW_ROWS formatted rows around for the console preview
+            preview = io.StringIO()
+            row_count = 0
+            
+            # 1 MB buffer so large IP lists are flushed in a handful of writes
+            with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                f.write(header)
                 f.write("=" * 150 + "\n")
-                
-                # Write IP configurations
-                for ip_name, config in sorted(self.ip_configs.items()):
-                    row = [
-                        ip_name.ljust(15),
-                        ("MASTER" if config.role == 'master' else "SLAVE").ljust(10),
-                        config.read_write.ljust(15),
-                        str(config.final_bit_width).ljust(15),
-                        str(config.final_frequency).ljust(15),
-                        config.final_protocol.ljust(15),
-                        config.final_clk_domain.ljust(15),
-                        config.connected_interconnect.ljust(15),
-                        config.original_name.ljust(15)
-                    ]
-                    f.write("".join(row) + "\n")
+                for ip_name, config in self._sorted_ip_configs():
+                    line = row_fmt.format(
+                        ip_name,
+                        config.role_label,
+                        config.read_write,
+                        config.final_bit_width,
+                        config.final_frequency,
+                        config.final_protocol,
+                        config.final_clk_domain,
+                        config.connected_interconnect,
+                        config.original_name
+                    )
+                    f.write(line)
+                    if row_count < self.PREVIEW_ROWS:
+                        preview.write(line)
+                    row_count += 1
             
             print(f"\nConfig file generated: {output_file.name}")
             
             # Print final output to console
             print("\nFinal Output Preview:")
-            print("".join(header))
-            print("-" * 150)
-            for ip_name, config in sorted(self.ip_configs.items()):
-                row = [
-                    ip_name.ljust(15),
-                    ("MASTER" if config.role == 'master' else "SLAVE").ljust(10),
-                    config.read_write.ljust(15),
-                    str(config.final_bit_width).ljust(15),
-                    str(config.final_frequency).ljust(15),
-                    config.final_protocol.ljust(15),
-                    config.final_clk_domain.ljust(15),
-                    config.connected_interconnect.ljust(15),
-                    config.original_name.ljust(15)
-                ]
-                print("".join(row))
+            sys.stdout.write(header + "-" * 150 + "\n" + preview.getvalue())
+            if row_count > self.PREVIEW_ROWS:
+                print(f"... {row_count - self.PREVIEW_ROWS} more rows in {output_file.name}")
             
         except Exception as e:
-            print(f"\n[ERROR] Generating config file: {str(e)}")
+            logger.error("Generating config file: %s", e)
             raise
 
 if __name__ == "__main__":
+    # INFO by default so per-row debug messages are never formatted; use DEBUG to trace parsing
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    
     print("IP-Interconnect Config Generator")
     print("=" * 60)
     